@@ -1,69 +1,214 @@
 import streamlit as st
 import pandas as pd
-import random
+import numpy as np
+import os
 import ast
-import csv
-from io import StringIO
+import json
 
 # Set page configuration
 st.set_page_config(page_title="xVisionx - Movie Recommendations", page_icon="🎬", layout="wide", initial_sidebar_state="expanded")
 
-# Load movie data from CSV
-@st.cache_data
-def load_movie_data():
+MOVIES_CSV = 'tmdb_5000_movies.csv'
+MOVIES_PARQUET = 'tmdb_5000_movies.parquet'
+MOVIES_AUX = 'tmdb_5000_movies.npz'
+RANDOM_POOL_SIZE = 10  # random recommendations are drawn from this many top-rated movies of a genre
+rng = np.random.default_rng()
+POPULAR_MOVIES = ("The Dark Knight", "Inception", "Pulp Fiction", "The Godfather", "Forrest Gump",
+                  "The Matrix", "Toy Story", "The Silence of the Lambs", "Star Wars",
+                  "The Lord of the Rings: The Fellowship of the Ring", "Finding Nemo", "The Avengers",
+                  "Titanic", "The Lion King", "Jurassic Park")
+DISCOVER_MOVIE_COUNT = 10
+
+# Extract genre names from a TMDB genres string (JSON, with a literal_eval fallback for malformed rows)
+def parse_genre_names(genres_str):
+    try: genres = json.loads(genres_str)
+    except json.JSONDecodeError: genres = ast.literal_eval(genres_str)
+    return [g["name"] for g in genres]
+
+# Parse the whole genres column with one JSON call, falling back to per-row parsing if any row is malformed
+def parse_genre_column(genre_strs):
+    try: parsed = json.loads(f"[{','.join(genre_strs)}]")
+    except json.JSONDecodeError: return genre_strs.map(parse_genre_names)
+    return pd.Series([[g["name"] for g in genres] for genres in parsed], index=genre_strs.index, dtype=object)
+
+# Parse the raw CSV into the movies frame plus its genre list, genre matrix and ratings array
+def parse_movie_data():
+    movies_df = pd.read_csv(MOVIES_CSV, engine='pyarrow', dtype_backend='pyarrow')
+    movies_df["genres"] = parse_genre_column(movies_df["genres"])
+    movies_df = movies_df.rename(columns={"vote_average": "rating", "release_date": "year"})
+    movies_df["year"] = pd.to_numeric(movies_df["year"].str.slice(-4), errors='coerce').astype("Int16")  # DD/MM/YYYY
+    
+    if "movie_id" not in movies_df.columns: movies_df["movie_id"] = movies_df.index + 1
+    if "popularity" not in movies_df.columns: movies_df["popularity"] = movies_df["rating"] * 10
+    movies_df = movies_df.astype({"rating": "float32[pyarrow]", "popularity": "float32[pyarrow]", "movie_id": "int32[pyarrow]"})
+    
+    # Genre indicator matrix: genre_matrix[i, j] = 1 if movie i has genre j
+    all_genres = sorted({genre for sublist in movies_df['genres'] for genre in sublist})
+    genre_to_idx = {genre: j for j, genre in enumerate(all_genres)}
+    genre_matrix = np.zeros((len(movies_df), len(all_genres)), dtype=np.float32)
+    for i, genres in enumerate(movies_df['genres']):
+        genre_matrix[i, [genre_to_idx[genre] for genre in genres]] = 1
+    # The same membership packed into one uint32 per movie (bit j = genre j; TMDB has ~20 genres)
+    movies_df["genre_bits"] = genre_matrix.astype(np.uint32) @ (np.uint32(1) << np.arange(len(all_genres), dtype=np.uint32))
+    ratings_arr = movies_df['rating'].fillna(5).to_numpy(np.float32)
+    return movies_df, all_genres, genre_matrix, ratings_arr
+
+# Read the parsed data back from the on-disk cache if it is newer than the CSV and this script
+def read_movie_cache():
     try:
-        movies_df = pd.read_csv('tmdb_5000_movies.csv')
-        movies_df["genres"] = movies_df["genres"].apply(lambda x: [g["name"] for g in ast.literal_eval(x)])
-        movies_df["genre"] = movies_df["genres"].apply(lambda x: x[0] if x else "Unknown")
-        movies_df = movies_df.rename(columns={"vote_average": "rating", "release_date": "year"})
-        movies_df["year"] = pd.to_datetime(movies_df["year"], format="mixed", errors='coerce').dt.year
-        
-        if "movie_id" not in movies_df.columns: movies_df["movie_id"] = movies_df.index + 1
-        if "popularity" not in movies_df.columns: movies_df["popularity"] = movies_df["rating"] * 10
-            
-        return movies_df
+        source_mtime = max(os.stat(MOVIES_CSV).st_mtime, os.stat(__file__).st_mtime)
+        if min(os.stat(MOVIES_PARQUET).st_mtime, os.stat(MOVIES_AUX).st_mtime) < source_mtime: return None
+        movies_df = pd.read_parquet(MOVIES_PARQUET, dtype_backend='pyarrow')
+        # Restore the columns Parquet hands back with different dtypes than parse_movie_data builds
+        movies_df["genres"] = movies_df["genres"].map(list)
+        movies_df = movies_df.astype({"year": "Int16", "genre_bits": np.uint32})
+        with np.load(MOVIES_AUX) as aux:
+            return movies_df, aux['genres'].tolist(), aux['genre_matrix'], aux['ratings']
+    except Exception:
+        return None
+
+# Persist the parsed data so fresh processes skip CSV parsing; a read-only disk just means no cache
+def write_movie_cache(movies_df, all_genres, genre_matrix, ratings_arr):
+    try:
+        movies_df.to_parquet(MOVIES_PARQUET, index=False)
+        np.savez(MOVIES_AUX, genres=np.array(all_genres), genre_matrix=genre_matrix, ratings=ratings_arr)
+    except Exception:
+        pass
+
+# Load movie data from the parsed cache, falling back to the CSV, and build the read-only lookups over it.
+# A resource cache hands every rerun these same objects instead of unpickling copies of them.
+@st.cache_resource
+def load_movie_index():
+    try:
+        cached = read_movie_cache()
+        if cached is None:
+            cached = parse_movie_data()
+            write_movie_cache(*cached)
     except FileNotFoundError:
         st.error("tmdb_5000_movies.csv not found")
-        return pd.DataFrame()
+        return pd.DataFrame(), [], {}, None, None, {}, pd.Index([]), {}, []
+    movies_df, all_genres, genre_matrix, ratings_arr = cached
+    genre_to_idx = {genre: j for j, genre in enumerate(all_genres)}
+    # Iterate in reverse so duplicate titles map to their first row
+    title_to_idx = {title: i for i, title in reversed(list(enumerate(movies_df['title'])))}
+    movie_id_index = pd.Index(movies_df['movie_id'])  # movie_id -> row position via get_loc/get_indexer
+    # Inverted index: genre -> row positions of its movies, highest rated first (ties in row order)
+    genre_rows = {}
+    for genre, j in genre_to_idx.items():
+        genre_idx = np.flatnonzero(genre_matrix[:, j])
+        genre_rows[genre] = genre_idx[np.argsort(-ratings_arr[genre_idx], kind='stable')]
+    # Rows shown on the Discover page: the first DISCOVER_MOVIE_COUNT popular titles present in the dataset
+    discover_rows = [title_to_idx[title] for title in POPULAR_MOVIES if title in title_to_idx][:DISCOVER_MOVIE_COUNT]
+    return movies_df, all_genres, genre_to_idx, genre_matrix, ratings_arr, title_to_idx, movie_id_index, genre_rows, discover_rows
+
+# The movies frame itself stays in st.cache_data so each rerun gets its own copy
+@st.cache_data
+def load_movie_data():
+    return load_movie_index()[0]
+
+# Indices of the k highest scores in descending order, without sorting the whole array.
+# Ties keep their original order so consecutive pages never overlap or skip a movie.
+def top_k_indices(scores, k):
+    k = min(k, len(scores))
+    if k == 0: return np.array([], dtype=np.intp)
+    kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+    above = np.flatnonzero(scores > kth_score)
+    ties = np.flatnonzero(scores == kth_score)[:k - len(above)]
+    top_idx = np.concatenate([above, ties])
+    return top_idx[np.argsort(-scores[top_idx], kind='stable')]
+
+# Pack genre names into a genre_bits-style bitmap, skipping names not in the dataset
+def to_genre_bits(genres):
+    return sum(1 << genre_to_idx[genre] for genre in set(genres) if genre in genre_to_idx)
+
+# Names of the genres set in a bitmap
+def genre_names_from_bits(bits):
+    return [genre for j, genre in enumerate(all_genres) if int(bits) >> j & 1]
 
 # Initialize session state
 def init_session_state():
+    if 'session_initialized' in st.session_state: return
     defaults = {
         'current_page': "Login", 'user_authenticated': False, 'username': "", 'user_ratings': {},
         'genre_preferences': {}, 'discover_complete': False, 'selected_menu': "Home",
         'new_user': True, 'random_movie_id': None
     }
     for key, value in defaults.items():
-        if key not in st.session_state: st.session_state[key] = value
+        st.session_state.setdefault(key, value)
+    st.session_state.session_initialized = True
+
+# Per-genre rating sums and counts over all rated movies
+def calculate_genre_totals(user_ratings):
+    rows = movie_id_index.get_indexer(list(user_ratings))
+    found = rows >= 0
+    ratings = np.fromiter(user_ratings.values(), np.float64, len(user_ratings))[found]
+    rated_genres = genre_matrix[rows[found]]
+    return ratings @ rated_genres, rated_genres.sum(axis=0)
+
+# Average rating per genre, for genres with at least one rating
+def genre_averages(genre_sums, genre_counts):
+    return {all_genres[j]: float(genre_sums[j] / genre_counts[j]) for j in np.flatnonzero(genre_counts)}
 
 # Calculate genre preferences from ratings
 def calculate_genre_preferences(movies_df, user_ratings):
-    genre_ratings, genre_counts = {}, {}
-    for movie_id, rating in user_ratings.items():
-        movie_row = movies_df[movies_df['movie_id'] == movie_id]
-        if not movie_row.empty:
-            for genre in movie_row.iloc[0]['genres']:
-                genre_ratings[genre] = genre_ratings.get(genre, 0) + rating
-                genre_counts[genre] = genre_counts.get(genre, 0) + 1
-    return {genre: genre_ratings[genre]/genre_counts[genre] for genre in genre_ratings if genre_counts[genre] > 0}
-
-# Create CSV data from user ratings
-def create_csv_data(movies_df, user_ratings):
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Movie Title", "Rating"])
-    for movie_id, rating in user_ratings.items():
-        movie_row = movies_df[movies_df['movie_id'] == movie_id]
-        if not movie_row.empty: writer.writerow([movie_row.iloc[0]['title'], rating])
-    return output.getvalue()
+    return genre_averages(*calculate_genre_totals(user_ratings))
+
+# Running genre sums and counts for the current user_ratings dict; rebuilt only when user_ratings is replaced
+def get_genre_totals():
+    user_ratings = st.session_state.user_ratings
+    cached = st.session_state.get('genre_totals')
+    if cached is None or cached[0] is not user_ratings:
+        cached = st.session_state.genre_totals = (user_ratings, *calculate_genre_totals(user_ratings))
+    return cached[1], cached[2]
+
+# Record a rating and update genre preferences incrementally from the running totals
+def rate_movie(movie_id, rating):
+    genre_sums, genre_counts = get_genre_totals()
+    old_rating = st.session_state.user_ratings.get(movie_id)
+    st.session_state.user_ratings[movie_id] = rating
+    if movie_id in movie_id_index:
+        movie_genres = genre_matrix[movie_id_index.get_loc(movie_id)]
+        genre_sums += (rating - (0 if old_rating is None else old_rating)) * movie_genres
+        if old_rating is None: genre_counts += movie_genres
+    st.session_state.genre_preferences = genre_averages(genre_sums, genre_counts)
+
+# Row of a movie by movie_id, or None if it is not in the dataset
+def get_movie_by_id(movie_id):
+    return movies_df.iloc[movie_id_index.get_loc(movie_id)] if movie_id in movie_id_index else None
+
+# Everything derived from genre_preferences that the pages need: preferred genres (average rating above 6),
+# genre bitmaps, the preference vector and its total. Cached in session state and rebuilt only when
+# genre_preferences is replaced.
+def get_preference_summary():
+    prefs = st.session_state.genre_preferences
+    cached = st.session_state.get('preference_summary')
+    if cached is None or cached[0] is not prefs:
+        preferred_genres = [genre for genre, avg_rating in prefs.items() if avg_rating > 6]
+        prefs_vec = np.zeros(len(genre_to_idx), dtype=np.float32)
+        for genre, avg_rating in prefs.items():
+            if genre in genre_to_idx: prefs_vec[genre_to_idx[genre]] = avg_rating
+        summary = {'preferred_genres': preferred_genres, 'preferred_bits': to_genre_bits(preferred_genres),
+                   'prefs_bits': to_genre_bits(prefs), 'prefs_vec': prefs_vec, 'max_possible_genre_score': prefs_vec.sum()}
+        cached = st.session_state.preference_summary = (prefs, summary)
+    return cached[1]
+
+# Create CSV data from user ratings; cached per ratings dict (the movie frame is static, so it is not hashed)
+@st.cache_data(max_entries=100)
+def create_csv_data(_movies_df, user_ratings):
+    rows = movie_id_index.get_indexer(list(user_ratings))
+    found = rows >= 0
+    ratings_df = pd.DataFrame({"Movie Title": _movies_df['title'].to_numpy()[rows[found]],
+                               "Rating": np.array(list(user_ratings.values()))[found]})
+    return ratings_df.to_csv(index=False)
 
 # Load user ratings from CSV
 def load_user_ratings_from_csv(uploaded_file, movies_df):
     try:
         csv_data = pd.read_csv(uploaded_file)
-        return {movie_row.iloc[0]['movie_id']: row['Rating'] for _, row in csv_data.iterrows() 
-                for movie_row in [movies_df[movies_df['title'] == row['Movie Title']] if not movies_df[movies_df['title'] == row['Movie Title']].empty else None] 
-                if movie_row is not None}
+        rows = csv_data['Movie Title'].map(title_to_idx)
+        found = rows.notna()
+        movie_ids = movies_df['movie_id'].to_numpy()[rows[found].astype(int)]
+        return dict(zip(movie_ids.tolist(), csv_data.loc[found, 'Rating'].tolist()))
     except Exception as e:
         st.error(f"Error reading CSV file: {e}")
         return {}
@@ -102,12 +247,11 @@ def login_page():
                     st.error("No valid ratings found in the uploaded file.")
 
 # Navigation menu
+MENU_ITEMS = [("Home", "🏠"), ("Discover", "🔍"), ("Genre Search", "🎭"), ("Random", "🎲"), ("Recommended", "⭐")]
+
 def custom_option_menu():
-    menu_options = ["Home", "Discover", "Genre Search", "Random", "Recommended"]
-    menu_icons = ["🏠", "🔍", "🎭", "🎲", "⭐"]
-    
-    cols = st.columns(len(menu_options))
-    for i, (option, icon) in enumerate(zip(menu_options, menu_icons)):
+    cols = st.columns(len(MENU_ITEMS))
+    for i, (option, icon) in enumerate(MENU_ITEMS):
         if cols[i].button(f"{icon} {option}", use_container_width=True, key=f"menu_{option}"):
             st.session_state.selected_menu = st.session_state.current_page = option
             st.rerun()
@@ -155,27 +299,19 @@ def discover_page():
     st.title("Discover Your Movie Preferences")
     st.markdown("Rate these popular movies to help us understand your taste")
     
-    popular_movies = ["The Dark Knight", "Inception", "Pulp Fiction", "The Godfather", "Forrest Gump", 
-                     "The Matrix", "Toy Story", "The Silence of the Lambs", "Star Wars", 
-                     "The Lord of the Rings: The Fellowship of the Ring", "Finding Nemo", "The Avengers", 
-                     "Titanic", "The Lion King", "Jurassic Park"]
-    
-    discover_movies = [m for m in popular_movies if not movies_df[movies_df['title'] == m].empty][:10]
     ratings = {}
     
-    for movie_title in discover_movies:
-        movie_data = movies_df[movies_df['title'] == movie_title].iloc[0]
-        st.subheader(f"{movie_title} ({', '.join(movie_data['genres'])})")
-        st.write(movie_data['overview'] if pd.notna(movie_data.get('overview', '')) else "No description available.")
-        current_rating = st.session_state.user_ratings.get(movie_data['movie_id'], 5)
-        ratings[movie_title] = (st.slider("Rate this movie", 1, 10, current_rating, key=f"discover_{movie_data['movie_id']}"), 
-                               movie_data['genres'], movie_data['movie_id'])
+    for movie_data in movies_df.iloc[discover_rows].itertuples():
+        st.subheader(f"{movie_data.title} ({', '.join(movie_data.genres)})")
+        st.write(movie_data.overview if pd.notna(movie_data.overview) else "No description available.")
+        current_rating = st.session_state.user_ratings.get(movie_data.movie_id, 5)
+        ratings[movie_data.title] = (st.slider("Rate this movie", 1, 10, current_rating, key=f"discover_{movie_data.movie_id}"), 
+                                    movie_data.genres, movie_data.movie_id)
         st.markdown("---")
     
     if st.button("Submit Ratings"):
         for movie_title, (rating, _, movie_id) in ratings.items():
-            st.session_state.user_ratings[movie_id] = rating
-        st.session_state.genre_preferences = calculate_genre_preferences(movies_df, st.session_state.user_ratings)
+            rate_movie(movie_id, rating)
         st.session_state.discover_complete = True
         st.success("Ratings submitted successfully!")
     
@@ -183,45 +319,63 @@ def discover_page():
         st.session_state.current_page = "Home"
         st.rerun()
 
+# Row positions of movies having any of the given genres; cached across reruns and sessions per genre selection
+@st.cache_data
+def get_genre_matches(selected_genres):
+    return np.unique(np.concatenate([genre_rows[genre] for genre in selected_genres]))
+
+# Details of the selected Genre Search result; a fragment so moving or submitting its rating reruns only this card
+@st.fragment
+def genre_search_movie_card(row, idx):
+    with st.expander(f"{row.title} ({row.year}) - {row.rating:.1f}/10", expanded=True):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**Genres**: {', '.join(row.genres)}")
+            if pd.notna(row.overview):
+                st.write(f"**Overview**: {row.overview}")
+            st.write(f"**Popularity**: {row.popularity:.1f}/100")
+        with col2:
+            current_rating = st.session_state.user_ratings.get(row.movie_id, 0)
+            rating = st.slider("Your rating", 1, 10, current_rating or 5, key=f"rate_{row.movie_id}_{idx}")
+            if st.button("Rate", key=f"btn_{row.movie_id}_{idx}"):
+                rate_movie(row.movie_id, rating)
+                st.success(f"Rated {row.title} as {rating}/10")
+
 def genre_search_page():
     st.title("Search Movies by Genre")
     
-    all_genres = sorted({genre for sublist in movies_df['genres'] for genre in sublist})
     selected_genres = st.multiselect("Select genres", all_genres, default=all_genres[:2])
     
     if selected_genres:
-        filtered_movies = movies_df[
-            movies_df['genres'].apply(lambda x: any(genre in x for genre in selected_genres))
-        ]
-        if 'rating' in filtered_movies.columns:
-            filtered_movies = filtered_movies.sort_values('rating', ascending=False)
+        match_idx = get_genre_matches(tuple(selected_genres))
         
-        st.subheader(f"Top {len(filtered_movies)} Movies in Selected Genres")
+        st.subheader(f"Top {len(match_idx)} Movies in Selected Genres")
         
         page_size = 10
-        total_pages = max(1, (len(filtered_movies) - 1) // page_size + 1)
+        total_pages = max(1, (len(match_idx) - 1) // page_size + 1)
         page = st.number_input("Page", min_value=1, max_value=total_pages, value=1)
         
         start_idx = (page - 1) * page_size
-        end_idx = min(start_idx + page_size, len(filtered_movies))
+        end_idx = min(start_idx + page_size, len(match_idx))
+        
+        # Only rank as far as the current page: each genre's rows are sorted by rating, so the
+        # top end_idx matches are all among the first end_idx rows of some selected genre
+        candidates = np.unique(np.concatenate([genre_rows[genre][:end_idx] for genre in selected_genres]))
+        page_idx = candidates[top_k_indices(ratings_arr[candidates], end_idx)[start_idx:end_idx]]
         
-        for idx in range(start_idx, end_idx):
-            row = filtered_movies.iloc[idx]
-            with st.expander(f"{row['title']} ({row.get('year', 'N/A')}) - {row.get('rating', 'N/A')}/10"):
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.write(f"**Genres**: {', '.join(row['genres'])}")
-                    if pd.notna(row.get('overview', '')):
-                        st.write(f"**Overview**: {row['overview']}")
-                    if 'popularity' in row:
-                        st.write(f"**Popularity**: {row['popularity']:.1f}/100")
-                with col2:
-                    current_rating = st.session_state.user_ratings.get(row['movie_id'], 0)
-                    rating = st.slider("Your rating", 1, 10, current_rating or 5, key=f"rate_{row['movie_id']}_{idx}")
-                    if st.button("Rate", key=f"btn_{row['movie_id']}_{idx}"):
-                        st.session_state.user_ratings[row['movie_id']] = rating
-                        st.session_state.genre_preferences = calculate_genre_preferences(movies_df, st.session_state.user_ratings)
-                        st.success(f"Rated {row['title']} as {rating}/10")
+        page_movies = movies_df.iloc[page_idx]
+        
+        # One table for the page; details and rating widgets only for the selected row
+        selection = st.dataframe(page_movies[['title', 'year', 'rating', 'genres']], width="stretch", hide_index=True,
+                                 column_config={'title': "Title", 'year': st.column_config.NumberColumn("Year", format="%d"),
+                                                'rating': st.column_config.NumberColumn("Rating", format="%.1f"), 'genres': "Genres"},
+                                 on_select="rerun", selection_mode="single-row", key=f"genre_table_{page}_{'|'.join(selected_genres)}")
+        selected_rows = [i for i in selection.selection.rows if i < len(page_movies)]
+        if selected_rows:
+            row = next(page_movies.iloc[selected_rows[:1]].itertuples(index=False))
+            genre_search_movie_card(row, start_idx + selected_rows[0])
+        else:
+            st.caption("Select a movie to see its details and rate it.")
     else:
         st.info("Please select at least one genre to see movies.")
     
@@ -231,11 +385,11 @@ def genre_search_page():
 
 # Get a random movie recommendation
 def get_random_movie():
-    preferred_genres = [genre for genre, avg_rating in st.session_state.genre_preferences.items() if avg_rating > 6]
+    preferred_genres = get_preference_summary()['preferred_genres']
     if not preferred_genres: return None
-    selected_genre = random.choice(preferred_genres)
-    genre_movies = movies_df[movies_df['genres'].apply(lambda x: selected_genre in x)]
-    return genre_movies.sort_values('rating', ascending=False).head(10).sample(1).iloc[0] if len(genre_movies) > 0 else None
+    selected_genre = rng.choice(preferred_genres)
+    genre_top_idx = genre_rows.get(selected_genre, [])[:RANDOM_POOL_SIZE]
+    return movies_df.iloc[int(rng.choice(genre_top_idx))] if len(genre_top_idx) > 0 else None
 
 # Random recommendation page
 def random_recommendation_page():
@@ -253,24 +407,23 @@ def random_recommendation_page():
         if random_movie is not None: st.session_state.random_movie_id = random_movie['movie_id']
         else: st.warning("No movies found for your preferred genres."); return
     else:
-        movie_row = movies_df[movies_df['movie_id'] == st.session_state.random_movie_id]
-        if not movie_row.empty: random_movie = movie_row.iloc[0]
-        else:
+        random_movie = get_movie_by_id(st.session_state.random_movie_id)
+        if random_movie is None:
             random_movie = get_random_movie()
             if random_movie is not None: st.session_state.random_movie_id = random_movie['movie_id']
             else: st.warning("No movies found for your preferred genres."); return
     
-    preferred_genres = [genre for genre, avg_rating in st.session_state.genre_preferences.items() if avg_rating > 6]
+    preference_summary = get_preference_summary()
     
     st.subheader("We think you'll enjoy...")
-    st.markdown(f"### {random_movie['title']} ({random_movie.get('year', 'N/A')})")
+    st.markdown(f"### {random_movie['title']} ({random_movie['year']})")
     st.write(f"**Genres**: {', '.join(random_movie['genres'])}")
-    common_genres = set(random_movie['genres']) & set(preferred_genres)
+    common_genres = genre_names_from_bits(random_movie['genre_bits'] & preference_summary['preferred_bits'])
     if common_genres: st.write(f"**Why we think you'll like it**: This movie shares your preferred genres: {', '.join(common_genres)}")
     
-    if 'rating' in random_movie: st.write(f"**Rating**: {random_movie['rating']}/10")
-    if 'popularity' in random_movie: st.write(f"**Popularity**: {random_movie['popularity']:.1f}/100")
-    if pd.notna(random_movie.get('overview', '')): st.write(f"**Overview**: {random_movie['overview']}")
+    st.write(f"**Rating**: {random_movie['rating']:.1f}/10")
+    st.write(f"**Popularity**: {random_movie['popularity']:.1f}/100")
+    if pd.notna(random_movie['overview']): st.write(f"**Overview**: {random_movie['overview']}")
     
     st.markdown("---")
     st.subheader("Rate this movie")
@@ -280,8 +433,7 @@ def random_recommendation_page():
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("Submit Rating"):
-            st.session_state.user_ratings[random_movie['movie_id']] = rating
-            st.session_state.genre_preferences = calculate_genre_preferences(movies_df, st.session_state.user_ratings)
+            rate_movie(random_movie['movie_id'], rating)
             st.success(f"Rated {random_movie['title']} as {rating}/10")
     with col2:
         if st.button("Another Recommendation"):
@@ -293,12 +445,46 @@ def random_recommendation_page():
             st.session_state.random_movie_id = None
             st.rerun()
 
-def calculate_recommendation_score(movie_genres, user_preferences, movie_rating):
-    genre_match_score = sum(user_preferences.get(genre, 0) for genre in movie_genres)
-    max_possible_genre_score = sum(user_preferences.values())
-    genre_score = (genre_match_score / max_possible_genre_score * 10) if max_possible_genre_score > 0 else 0
-    rating_score = movie_rating if pd.notna(movie_rating) else 5
-    return (genre_score * 0.75) + (rating_score * 0.25)
+# Score every movie at once: 75% genre match, 25% movie rating
+def calculate_recommendation_scores():
+    preference_summary = get_preference_summary()
+    prefs_vec, max_possible_genre_score = preference_summary['prefs_vec'], preference_summary['max_possible_genre_score']
+    # Normalise the small preference vector rather than the per-movie result, so scoring is one matvec
+    if max_possible_genre_score > 0: genre_scores = genre_matrix @ (prefs_vec * (10 / max_possible_genre_score))
+    else: genre_scores = np.zeros_like(ratings_arr)
+    return (genre_scores * 0.75) + (ratings_arr * 0.25)
+
+# Row positions, scores and "why" texts of the top 20 recommendations, kept in session state until
+# genre_preferences is replaced
+def get_top_recommendations():
+    prefs = st.session_state.genre_preferences
+    cached = st.session_state.get('top_recommendations')
+    if cached is None or cached[0] is not prefs:
+        scores = calculate_recommendation_scores()
+        top_idx = top_k_indices(scores, 20)
+        prefs_bits = get_preference_summary()['prefs_bits']
+        reasons = [", ".join(f"{genre} (you rated: {prefs[genre]:.1f}/10)" for genre in genre_names_from_bits(bits & prefs_bits))
+                   for bits in movies_df['genre_bits'].to_numpy()[top_idx]]
+        cached = st.session_state.top_recommendations = (prefs, top_idx, scores[top_idx], reasons)
+    return cached[1:]
+
+# One recommendation; a fragment so rating it does not rescore and rerender the whole list
+@st.fragment
+def recommended_movie_card(row, score, reason, idx):
+    with st.expander(f"{row.title} ({row.year}) - Recommendation Score: {score:.1f}/10"):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**Genres**: {', '.join(row.genres)}")
+            if reason: st.write(f"**Why we think you'll like it**: You enjoy {reason}")
+            if pd.notna(row.overview): st.write(f"**Overview**: {row.overview}")
+            st.write(f"**Popularity**: {row.popularity:.1f}/100")
+            st.write(f"**Movie Rating**: {row.rating:.1f}/10")
+        with col2:
+            current_rating = st.session_state.user_ratings.get(row.movie_id, 5)
+            rating = st.slider("Your rating", 1, 10, current_rating, key=f"rate_rec_{row.movie_id}_{idx}")
+            if st.button("Rate", key=f"btn_rec_{row.movie_id}_{idx}"):
+                rate_movie(row.movie_id, rating)
+                st.success(f"Rated {row.title} as {rating}/10")
 
 def recommended_movies_page():
     st.title("Movies You Might Like")
@@ -310,51 +496,36 @@ def recommended_movies_page():
             st.rerun()
         return
     
-    preferred_genres = [genre for genre, avg_rating in st.session_state.genre_preferences.items() if avg_rating > 6]
-    if not preferred_genres:
+    preference_summary = get_preference_summary()
+    if not preference_summary['preferred_genres']:
         st.warning("Rate more movies to discover preferences.")
         if st.button("Discover Your Preferences"):
             st.session_state.current_page = "Discover"
             st.rerun()
         return
     
-    movies_with_scores = [(row, calculate_recommendation_score(row['genres'], st.session_state.genre_preferences, row['rating'])) 
-                         for _, row in movies_df.iterrows()]
-    movies_with_scores.sort(key=lambda x: x[1], reverse=True)
-    top_recommendations = [movie for movie, score in movies_with_scores[:20]]
+    top_idx, top_scores, reasons = get_top_recommendations()
     
-    st.subheader(f"Top {len(top_recommendations)} Recommendations Based on Your Preferences")
+    st.subheader(f"Top {len(top_idx)} Recommendations Based on Your Preferences")
     st.info("🎯 Recommendations are weighted 75% by your genre preferences and 25% by movie ratings")
     
-    for idx, row in enumerate(top_recommendations):
-        with st.expander(f"{row['title']} ({row.get('year', 'N/A')}) - Recommendation Score: {movies_with_scores[idx][1]:.1f}/10"):
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.write(f"**Genres**: {', '.join(row['genres'])}")
-                common_genres = set(row['genres']) & set(st.session_state.genre_preferences.keys())
-                if common_genres:
-                    genre_explanations = [f"{genre} (you rated: {st.session_state.genre_preferences[genre]:.1f}/10)" for genre in common_genres]
-                    st.write(f"**Why we think you'll like it**: You enjoy {', '.join(genre_explanations)}")
-                if pd.notna(row.get('overview', '')): st.write(f"**Overview**: {row['overview']}")
-                if 'popularity' in row: st.write(f"**Popularity**: {row['popularity']:.1f}/100")
-                if 'rating' in row: st.write(f"**Movie Rating**: {row['rating']}/10")
-            with col2:
-                current_rating = st.session_state.user_ratings.get(row['movie_id'], 5)
-                rating = st.slider("Your rating", 1, 10, current_rating, key=f"rate_rec_{row['movie_id']}_{idx}")
-                if st.button("Rate", key=f"btn_rec_{row['movie_id']}_{idx}"):
-                    st.session_state.user_ratings[row['movie_id']] = rating
-                    st.session_state.genre_preferences = calculate_genre_preferences(movies_df, st.session_state.user_ratings)
-                    st.success(f"Rated {row['title']} as {rating}/10")
+    for idx, (row, score, reason) in enumerate(zip(movies_df.iloc[top_idx].itertuples(index=False), top_scores, reasons)):
+        recommended_movie_card(row, score, reason, idx)
     
     if st.button("Back to Home"):
         st.session_state.current_page = "Home"
         st.rerun()
 
+PAGES = {"Home": home_page, "Discover": discover_page, "Genre Search": genre_search_page, 
+         "Random": random_recommendation_page, "Recommended": recommended_movies_page}
+
 # Main app logic
 def main():
     init_session_state()
-    global movies_df
-    movies_df = load_movie_data()    
+    global movies_df, all_genres, genre_to_idx, genre_matrix, ratings_arr, title_to_idx, movie_id_index, genre_rows, discover_rows
+    (_, all_genres, genre_to_idx, genre_matrix, ratings_arr, title_to_idx, movie_id_index, genre_rows,
+     discover_rows) = load_movie_index()
+    movies_df = load_movie_data()
     if movies_df.empty: return st.error("Failed to load movie data")
     
     with st.sidebar:
@@ -371,9 +542,7 @@ def main():
         else: st.write("Please login to access movie recommendations")
     
     if not st.session_state.user_authenticated: login_page()
-    else: {"Home": home_page, "Discover": discover_page, "Genre Search": genre_search_page, 
-           "Random": random_recommendation_page, "Recommended": recommended_movies_page
-          }.get(st.session_state.current_page, home_page)()
+    else: PAGES.get(st.session_state.current_page, home_page)()
 
 if __name__ == "__main__":
     main()